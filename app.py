@@ -1,25 +1,103 @@
+import os
 import dash
 from dash import dcc, html, Input, Output, State, ALL
 import dash_bootstrap_components as dbc
+import numpy as np
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+from flask_caching import Cache
+
+# pyarrow is optional: it enables the streaming CSV reader and the Parquet cache
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    from pyarrow import csv as pacsv
+    _has_pyarrow = True
+except ImportError:
+    _has_pyarrow = False
 
 # - - - - - DATA LOADING AND CLEANING - - - - -
 
+# Stored in the Parquet cache's metadata. Bump it whenever the cleaning in load_and_clean_data
+# changes, so caches written by older code are rebuilt instead of silently reused
+CACHE_VERSION = '1'
+
+def read_cache(cache_file, csv_file):
+    # Return the cached cleaned data, or None if the cache is missing, older than the CSV,
+    # from another CACHE_VERSION, or unreadable
+    try:
+        if os.path.getmtime(cache_file) < os.path.getmtime(csv_file):
+            return None
+        metadata = pq.read_schema(cache_file).metadata or {}
+        if metadata.get(b'cache_version') != CACHE_VERSION.encode():
+            return None
+        return pd.read_parquet(cache_file)
+    except (OSError, pa.ArrowException):
+        return None
+
+def write_cache(df, cache_file):
+    # Write to a temporary file and move it into place, so other workers never read a partial file.
+    # Failing to write the cache is not fatal
+    table = pa.Table.from_pandas(df)
+    table = table.replace_schema_metadata({**table.schema.metadata, b'cache_version': CACHE_VERSION.encode()})
+    tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+    try:
+        pq.write_table(table, tmp_file, compression='zstd')
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
 def load_and_clean_data(filename):
-    df = pd.read_csv(filename, low_memory=False)
-
-    # Columns to drop due to blank entries or being unnecessary
-    columns_to_drop = [
-        'matched_2021', 'new_item_2022', 'serving_size_text',
-        'serving_size_household', 'potassium', 'notes', 'calories_text',
-        'total_fat_text', 'saturated_fat_text', 'trans_fat_text',
-        'cholesterol_text', 'sodium_text', 'carbohydrates_text',
-        'dietary_fiber_text', 'sugar_text', 'protein_text'
+    # Nutrition columns to be converted to numeric
+    nutrition_columns = [
+        'calories_(kCal)', 'total_fat_(g)', 'saturated_fat_(g)', 'trans_fat_(g)', 'cholesterol_(mg/dL)',
+        'sodium_(mg)', 'carbohydrates_(g)', 'dietary_fiber_(g)', 'sugar_(g)', 'protein_(g)'
     ]
 
-    # Remove rows with NaN in the "serving_size" column and drop unnecessary columns
-    df = df.dropna(subset=['serving_size']).drop(columns=columns_to_drop)
+    # Columns to read and the types to read them as. The other columns (matched_2021, new_item_2022,
+    # potassium, notes, serving_size_text/household and the *_text columns) are blank or unnecessary,
+    # so the reader skips them without parsing.
+    # Every type is given explicitly so neither reader has to infer them; serving_size is text (displayed
+    # as-is, has entries like '1 finger') and the nutrition columns are read as text and coerced to
+    # numbers after cleaning
+    column_dtypes = {
+        'menu_item_id': 'int64',
+        'food_category': 'str',
+        'restaurant': 'str',
+        'item_name': 'str',
+        'item_description': 'str',
+        'serving_size': 'str',
+        'serving_size_unit': 'str',
+    }
+    column_dtypes.update({c: 'str' for c in nutrition_columns})
+
+    # Reuse the cleaned data cached next to the CSV unless the CSV has changed since
+    cache_file = os.path.splitext(filename)[0] + '.parquet'
+    if _has_pyarrow:
+        df = read_cache(cache_file, filename)
+        if df is not None:
+            return df, nutrition_columns
+
+    if _has_pyarrow:
+        # Stream the CSV with pyarrow in record batches, removing rows with no "serving_size"
+        # batch by batch, so the raw file is never held in memory at once
+        convert_options = pacsv.ConvertOptions(
+            include_columns=list(column_dtypes),
+            column_types={c: pa.type_for_alias(t) for c, t in column_dtypes.items()},
+            strings_can_be_null=True,
+        )
+        with pacsv.open_csv(filename, convert_options=convert_options) as reader:
+            batches = [batch.filter(pc.is_valid(batch['serving_size'])) for batch in reader]
+            df = pa.Table.from_batches(batches, schema=reader.schema).to_pandas()
+    else:
+        # Without pyarrow, fall back to the C parser, reading the whole file in one pass
+        df = pd.read_csv(filename, usecols=list(column_dtypes), dtype=column_dtypes, low_memory=False)
+
+        # Remove rows with NaN in the "serving_size" column
+        df = df.dropna(subset=['serving_size'])
 
     # Replace NaN in 'serving_size_unit' with 'Unit'
     df['serving_size_unit'] = df['serving_size_unit'].fillna('Unit')
@@ -27,31 +105,124 @@ def load_and_clean_data(filename):
     # Remove duplicate rows
     df = df.drop_duplicates()
 
-    # Nutrition columns to be converted to numeric
-    nutrition_columns = [
-        'calories_(kCal)', 'total_fat_(g)', 'saturated_fat_(g)', 'trans_fat_(g)', 'cholesterol_(mg/dL)',
-        'sodium_(mg)', 'carbohydrates_(g)', 'dietary_fiber_(g)', 'sugar_(g)', 'protein_(g)'
-    ]
+    # Convert nutrition columns to numeric, replacing non-numeric entries (e.g. '0-120', '160+') with NaN.
+    # float32 is plenty of precision for nutrition values and halves the memory of every column
+    df[nutrition_columns] = df[nutrition_columns].apply(pd.to_numeric, errors='coerce').astype('float32')
+
+    # Store low-cardinality text columns as categoricals so grouping and filtering work on integer codes
+    for c in ['restaurant', 'food_category', 'serving_size_unit']:
+        df[c] = df[c].astype('category')
 
-    # Convert nutrition columns to numeric, replacing non-numeric entries with NaN
-    df[nutrition_columns] = df[nutrition_columns].apply(pd.to_numeric, errors='coerce')
+    # Calculate macronutrient calories (float32, like the columns they come from) in one vectorized pass.
+    # Scaling each column separately rather than a matrix product keeps a missing value from spreading to the others
+    grams = df[['carbohydrates_(g)', 'total_fat_(g)', 'protein_(g)']].to_numpy(dtype='float32')
+    df[['carb_calories', 'fat_calories', 'protein_calories']] = grams * np.array([4, 9, 4], dtype='float32')
 
-    # Calculate macronutrient calories
-    df['carb_calories'] = df['carbohydrates_(g)'] * 4
-    df['fat_calories'] = df['total_fat_(g)'] * 9
-    df['protein_calories'] = df['protein_(g)'] * 4
+    # Cache the cleaned data for the next startup
+    if _has_pyarrow:
+        write_cache(df, cache_file)
 
     return df, nutrition_columns
 
 # Load the data
 df, nutrition_columns = load_and_clean_data("ms_annual_data_2022.csv")
 
+# - - - - - LOOKUP TABLES - - - - -
+
+def make_options(values):
+    return [{'label': v, 'value': v} for v in values]
+
+# The data is fixed once loaded, so dropdown contents are computed here once
+# and looking them up is a dictionary access
+# The categoricals' categories are already the sorted unique values
+ALL_RESTAURANTS = df['restaurant'].cat.categories.tolist()
+ALL_CATEGORIES = df['food_category'].cat.categories.tolist()
+
+# First row for each item name, indexed by name for hash lookups
+ITEM_INDEX = df.drop_duplicates('item_name').set_index('item_name')
+# Item names are already unique in the index, so sort those instead of the full column
+ALL_ITEMS = ITEM_INDEX.index.sort_values().tolist()
+
+# restaurant -> sorted categories, (restaurant, category) -> sorted items, item -> first row's restaurant/category
+CATS_BY_REST = df.groupby('restaurant', observed=True)['food_category'].unique().apply(sorted).to_dict()
+ITEMS_BY_RC = {(r, c): sorted(g['item_name'].unique()) for (r, c), g in df.groupby(['restaurant', 'food_category'], observed=True)}
+ITEM_LOOKUP = ITEM_INDEX[['restaurant', 'food_category']].to_dict('index')
+# restaurant -> sorted items, category -> sorted items
+ITEMS_BY_REST = df.groupby('restaurant', observed=True)['item_name'].unique().apply(sorted).to_dict()
+ITEMS_BY_CAT = df.groupby('food_category', observed=True)['item_name'].unique().apply(sorted).to_dict()
+# item -> every restaurant that serves an item with that name
+ITEM_RESTAURANTS = {}
+for item, restaurant in zip(df['item_name'].tolist(), df['restaurant'].tolist()):
+    ITEM_RESTAURANTS.setdefault(item, set()).add(restaurant)
+
+# Prebuilt dropdown options so callbacks return cached lists instead of rebuilding them
+RESTAURANT_OPTIONS = make_options(ALL_RESTAURANTS)
+CATEGORY_OPTIONS = make_options(ALL_CATEGORIES)
+ITEM_OPTIONS = make_options(ALL_ITEMS)
+NUTRIENT_OPTIONS = [{'label': n.replace('_', ' ').title(), 'value': n} for n in nutrition_columns]
+GROUPBY_OPTIONS = [
+    {'label': 'Restaurant', 'value': 'restaurant'},
+    {'label': 'Food Category', 'value': 'food_category'}
+]
+
+# Compact JSON copy of the explore-page lookups, sent with the Explore page so the dropdown
+# chaining callbacks run client-side without a server round trip. Each name is sent once in
+# 'restaurants', 'categories' or 'items'; the other tables refer to them by list position
+REST_POS = {r: i for i, r in enumerate(ALL_RESTAURANTS)}
+CAT_POS = {c: i for i, c in enumerate(ALL_CATEGORIES)}
+ITEM_POS = {item: i for i, item in enumerate(ALL_ITEMS)}
+DROPDOWN_LOOKUP = {
+    'restaurants': ALL_RESTAURANTS,
+    'categories': ALL_CATEGORIES,
+    'items': ALL_ITEMS,
+    # restaurant -> its categories
+    'cats_by_rest': [[CAT_POS[c] for c in CATS_BY_REST.get(r, [])] for r in ALL_RESTAURANTS],
+    # restaurant -> {category: its items}
+    'items_by_rc': [
+        {CAT_POS[c]: [ITEM_POS[item] for item in ITEMS_BY_RC[(r, c)]] for c in CATS_BY_REST.get(r, [])}
+        for r in ALL_RESTAURANTS
+    ],
+    # restaurant -> its items, category -> its items
+    'items_by_rest': [[ITEM_POS[item] for item in ITEMS_BY_REST.get(r, [])] for r in ALL_RESTAURANTS],
+    'items_by_cat': [[ITEM_POS[item] for item in ITEMS_BY_CAT.get(c, [])] for c in ALL_CATEGORIES],
+    # item -> restaurant and category of its first row
+    'item_rest': [REST_POS[ITEM_LOOKUP[item]['restaurant']] for item in ALL_ITEMS],
+    'item_cat': [CAT_POS[ITEM_LOOKUP[item]['food_category']] for item in ALL_ITEMS],
+    # item -> every restaurant serving it, only for the few names served by more than one
+    'item_restaurants': {
+        ITEM_POS[item]: sorted(REST_POS[r] for r in rests)
+        for item, rests in ITEM_RESTAURANTS.items() if len(rests) > 1
+    },
+}
+
+# - - - - - PRECOMPUTED ANALYTICS - - - - -
+
+# Group averages and summary statistics for every nutrient; the analytics callbacks only slice these
+REST_MEANS = df.groupby('restaurant', observed=True)[nutrition_columns].mean().astype('float32')
+CAT_MEANS = df.groupby('food_category', observed=True)[nutrition_columns].mean().astype('float32')
+# group_by column -> table with (nutrient, statistic) columns
+SUMMARY_STATS = {
+    group_by: df.groupby(group_by, observed=True)[nutrition_columns].agg(['mean', 'median', 'std', 'min', 'max'])
+    for group_by in ['restaurant', 'food_category']
+}
+
+# nutrient -> items with that nutrient recorded, sorted highest first / lowest first
+TOPN_DESC = {}
+TOPN_ASC = {}
+for nutrient in nutrition_columns:
+    nutrient_df = df[['item_name', 'restaurant', nutrient]].dropna(subset=[nutrient])
+    TOPN_DESC[nutrient] = nutrient_df.sort_values(by=nutrient, ascending=False).reset_index(drop=True)
+    TOPN_ASC[nutrient] = nutrient_df.sort_values(by=nutrient, ascending=True).reset_index(drop=True)
+
 # - - - - - DASH APP SETUP - - - - -
 
 # Set suppress_callback_exceptions to True
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.JOURNAL], suppress_callback_exceptions=True)
 server = app.server  # Needed for deployment
 
+# Memoize serialized figures so repeat selections skip rebuilding them
+cache = Cache(server, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 3600})
+
 # - - - - - LAYOUT COMPONENTS - - - - -
 
 # Header with navigation links centered
@@ -101,7 +272,7 @@ def explore_layout():
                     dbc.Label("Select Restaurant"),
                     dcc.Dropdown(
                         id='restaurant-dropdown',
-                        options=[{'label': r, 'value': r} for r in sorted(df['restaurant'].unique())],
+                        options=RESTAURANT_OPTIONS,
                         placeholder='Select a restaurant',
                         clearable=True,
                     ),
@@ -136,6 +307,7 @@ def explore_layout():
             ], width=8),
         ], className="mb-4"),
         html.Div(id='item-info-output'),
+        dcc.Store(id='lookup-store', data=DROPDOWN_LOOKUP),
     ])
 
 def compare_layout():
@@ -147,7 +319,7 @@ def compare_layout():
                 dbc.Label("Select Food Items"),
                 dcc.Dropdown(
                     id='compare-items-dropdown',
-                    options=[{'label': item, 'value': item} for item in sorted(df['item_name'].unique())],
+                    options=ITEM_OPTIONS,
                     placeholder='Select food items to compare',
                     multi=True,
                     clearable=True,
@@ -159,7 +331,7 @@ def compare_layout():
                 dbc.Label("Select Nutrition Metrics"),
                 dcc.Dropdown(
                     id='compare-metrics-dropdown',
-                    options=[{'label': n.replace('_', ' ').title(), 'value': n} for n in nutrition_columns],
+                    options=NUTRIENT_OPTIONS,
                     placeholder='Select nutrition metrics to compare',
                     multi=True,
                     clearable=True,
@@ -183,6 +355,11 @@ def analytics_layout():
         html.Div(id='analytics-content')
     ], fluid=True)
 
+# The pages only depend on the loaded data, so each one is built once and reused
+EXPLORE_PAGE = explore_layout()
+COMPARE_PAGE = compare_layout()
+ANALYTICS_PAGE = analytics_layout()
+
 # - - - - - CALLBACKS - - - - -
 
 # Update page content based on URL
@@ -193,90 +370,119 @@ def analytics_layout():
 )
 def render_page_content(pathname):
     if pathname == "/" or pathname == "/explore":
-        return explore_layout(), [True, False, False]
+        return EXPLORE_PAGE, [True, False, False]
     elif pathname == "/compare":
-        return compare_layout(), [False, True, False]
+        return COMPARE_PAGE, [False, True, False]
     elif pathname == "/analytics":
-        return analytics_layout(), [False, False, True]
+        return ANALYTICS_PAGE, [False, False, True]
     else:
         return html.Div([
             html.H1("404: Not found", className="text-danger"),
             html.Hr(),
             html.P(f"The pathname {pathname} was not recognized...")
         ]), [False, False, False]
-@app.callback(
+# Update the map for the selected restaurant
+app.clientside_callback(
+    """
+    function(selectedRestaurant) {
+        if (!selectedRestaurant) {
+            return "";
+        }
+        // URL for Google Maps search near Carbondale, IL for the selected restaurant
+        return "https://www.google.com/maps/embed/v1/search?key=INSERTKEY=" + selectedRestaurant;
+    }
+    """,
     Output('google-map', 'src'),
     [Input('restaurant-dropdown', 'value')]
 )
-def update_map(selected_restaurant):
-    if selected_restaurant is None:
-        return ""
-    
-    # URL for Google Maps search near Carbondale, IL for the selected restaurant
-    google_map_url = f"https://www.google.com/maps/embed/v1/search?key=INSERTKEY={selected_restaurant}"
-    return google_map_url
-    
+
 # Update category dropdown based on selected restaurant
-@app.callback(
+app.clientside_callback(
+    """
+    function(selectedRestaurant, selectedItem, lookup) {
+        if (selectedItem && !selectedRestaurant) {
+            // Autofill restaurant and category based on selected item
+            const item = lookup.items.indexOf(selectedItem);
+            return item < 0 ? [] : [lookup.categories[lookup.item_cat[item]]];
+        } else if (selectedRestaurant) {
+            const rest = lookup.restaurants.indexOf(selectedRestaurant);
+            return rest < 0 ? [] : lookup.cats_by_rest[rest].map(c => lookup.categories[c]);
+        }
+        // If no restaurant is selected, show all categories
+        return lookup.categories;
+    }
+    """,
     Output('category-dropdown', 'options'),
     [Input('restaurant-dropdown', 'value'),
-     Input('item-dropdown', 'value')]
+     Input('item-dropdown', 'value')],
+    [State('lookup-store', 'data')]
 )
-def update_category_dropdown(selected_restaurant, selected_item):
-    if selected_item and not selected_restaurant:
-        # Autofill restaurant and category based on selected item
-        item_row = df[df['item_name'] == selected_item].iloc[0]
-        return [{'label': item_row['food_category'], 'value': item_row['food_category']}]
-    elif selected_restaurant:
-        filtered_df = df[df['restaurant'] == selected_restaurant]
-        categories = filtered_df['food_category'].unique()
-        return [{'label': c, 'value': c} for c in sorted(categories)]
-    else:
-        # If no restaurant is selected, show all categories
-        categories = df['food_category'].unique()
-        return [{'label': c, 'value': c} for c in sorted(categories)]
 
 # Update item dropdown based on selected restaurant and category
-@app.callback(
+app.clientside_callback(
+    """
+    function(selectedRestaurant, selectedCategory, lookup) {
+        if (!selectedRestaurant && !selectedCategory) {
+            // If neither restaurant nor category is selected, show all items
+            return lookup.items;
+        }
+        const rest = lookup.restaurants.indexOf(selectedRestaurant);
+        const cat = lookup.categories.indexOf(selectedCategory);
+        let itemIds;
+        if (selectedRestaurant && selectedCategory) {
+            itemIds = rest < 0 ? null : lookup.items_by_rc[rest][cat];
+        } else if (selectedRestaurant) {
+            itemIds = lookup.items_by_rest[rest];
+        } else {
+            itemIds = lookup.items_by_cat[cat];
+        }
+        return (itemIds || []).map(i => lookup.items[i]);
+    }
+    """,
     Output('item-dropdown', 'options'),
     [Input('restaurant-dropdown', 'value'),
-     Input('category-dropdown', 'value')]
+     Input('category-dropdown', 'value')],
+    [State('lookup-store', 'data')]
 )
-def update_item_dropdown(selected_restaurant, selected_category):
-    if selected_restaurant and selected_category:
-        filtered_df = df[(df['restaurant'] == selected_restaurant) & (df['food_category'] == selected_category)]
-    elif selected_restaurant:
-        filtered_df = df[df['restaurant'] == selected_restaurant]
-    elif selected_category:
-        filtered_df = df[df['food_category'] == selected_category]
-    else:
-        # If neither restaurant nor category is selected, show all items
-        filtered_df = df
-    items = filtered_df['item_name'].unique()
-    return [{'label': i, 'value': i} for i in sorted(items)]
 
 # Autofill restaurant and category when item is selected
-@app.callback(
+app.clientside_callback(
+    """
+    function(selectedItem, currentRestaurant, currentCategory, lookup) {
+        if (!selectedItem) {
+            return [currentRestaurant, currentCategory];
+        }
+        const item = lookup.items.indexOf(selectedItem);
+        if (item < 0) {
+            return [currentRestaurant, currentCategory];
+        }
+        // Only names served by several restaurants are listed; the rest have just their first row's
+        const itemRestaurants = (lookup.item_restaurants[item] || [lookup.item_rest[item]]).map(r => lookup.restaurants[r]);
+        let restaurant = currentRestaurant;  // Retain the current selection if it matches
+        // If the current restaurant is None or does not match the selected item, update it
+        if (currentRestaurant == null || !itemRestaurants.includes(currentRestaurant)) {
+            restaurant = lookup.restaurants[lookup.item_rest[item]];
+        }
+        return [restaurant, lookup.categories[lookup.item_cat[item]]];
+    }
+    """,
     [Output('restaurant-dropdown', 'value'),
      Output('category-dropdown', 'value')],
     [Input('item-dropdown', 'value')],
     [State('restaurant-dropdown', 'value'),
-     State('category-dropdown', 'value')]
+     State('category-dropdown', 'value'),
+     State('lookup-store', 'data')]
 )
-def autofill_restaurant_category(selected_item, current_restaurant, current_category):
-    if selected_item:
-        item_row = df[df['item_name'] == selected_item]
-        
-        # If the current restaurant is None or does not match the selected item, update it
-        if current_restaurant is None or current_restaurant not in item_row['restaurant'].values:
-            restaurant = item_row.iloc[0]['restaurant']
-        else:
-            restaurant = current_restaurant  # Retain the current selection if it matches
-        
-        category = item_row.iloc[0]['food_category']
-        return restaurant, category
-    else:
-        return current_restaurant, current_category
+
+# Caloric breakdown pie chart for an item
+@cache.memoize()
+def macronutrient_pie_figure(selected_item):
+    item_data = ITEM_INDEX.loc[selected_item]
+    labels = ['Carbohydrates', 'Fats', 'Proteins']
+    values = [item_data['carb_calories'], item_data['fat_calories'], item_data['protein_calories']]
+    fig = go.Figure(go.Pie(labels=labels, values=values, marker_colors=qualitative.Set2))
+    fig.update_layout(title='Caloric Breakdown by Macronutrient')
+    return fig.to_plotly_json()
 
 # Display item information for selected item
 @app.callback(
@@ -286,7 +492,7 @@ def autofill_restaurant_category(selected_item, current_restaurant, current_cate
 def display_item_info(selected_item):
     if selected_item:
         # Retrieve the selected item data
-        item_data = df[df['item_name'] == selected_item].iloc[0]
+        item_data = ITEM_INDEX.loc[selected_item]
         # Create output components
         outputs = []
         outputs.append(html.H4(selected_item))
@@ -297,15 +503,7 @@ def display_item_info(selected_item):
         serving_size = f"{item_data['serving_size']} {item_data['serving_size_unit']}"
         outputs.append(html.P(f"Serving Size: {serving_size}"))
         # Caloric breakdown pie chart
-        labels = ['Carbohydrates', 'Fats', 'Proteins']
-        values = [item_data['carb_calories'], item_data['fat_calories'], item_data['protein_calories']]
-        fig = px.pie(
-            names=labels,
-            values=values,
-            title='Caloric Breakdown by Macronutrient',
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
-        outputs.append(dcc.Graph(figure=fig))
+        outputs.append(dcc.Graph(figure=macronutrient_pie_figure(selected_item)))
         # Nutrition Information
         nutrition_info = item_data[nutrition_columns].to_dict()
         table_rows = [
@@ -333,6 +531,26 @@ def display_item_info(selected_item):
     #     return dcc.Graph(figure=fig)
     
 
+# Grouped bar chart comparing items
+@cache.memoize()
+def compare_figure(selected_items, selected_metrics):
+    # One bar trace per item, using the same row for each item as the Explore page.
+    # Unknown item names are left out
+    known_items = [item for item in selected_items if item in ITEM_INDEX.index]
+    amounts = ITEM_INDEX.loc[known_items, selected_metrics]
+    fig = go.Figure()
+    for item_name, item_amounts in zip(amounts.index, amounts.to_numpy()):
+        fig.add_bar(name=item_name, x=selected_metrics, y=item_amounts)
+    fig.update_layout(
+        barmode='group',
+        title='Nutrition Comparison',
+        xaxis_title='Nutrient',
+        yaxis_title='Amount',
+        legend_title_text='Item Name',
+        template='simple_white'
+    )
+    return fig.to_plotly_json()
+
 # Update compare output based on selected items and metrics
 @app.callback(
     Output('compare-output', 'children'),
@@ -341,28 +559,7 @@ def display_item_info(selected_item):
 )
 def update_compare_output(selected_items, selected_metrics):
     if selected_items and selected_metrics:
-        compare_df = df[df['item_name'].isin(selected_items)]
-        melted_df = compare_df.melt(
-            id_vars=['item_name'],
-            value_vars=selected_metrics,
-            var_name='Nutrient',
-            value_name='Amount'
-        )
-        fig = px.bar(
-            melted_df,
-            x='Nutrient',
-            y='Amount',
-            color='item_name',
-            barmode='group',
-            title='Nutrition Comparison',
-            labels={
-                'Nutrient': 'Nutrient',
-                'Amount': 'Amount',
-                'item_name': 'Item Name'
-            },
-            template='simple_white'
-        )
-        return dcc.Graph(figure=fig)
+        return dcc.Graph(figure=compare_figure(selected_items, selected_metrics))
     # else:
     #     # Display a blank graph when inputs are not selected
     #     fig = px.bar(title='Nutrition Comparison')
@@ -396,7 +593,7 @@ def nutritional_distribution_layout():
                 dbc.Label("Select Nutrient"),
                 dcc.Dropdown(
                     id='dist-nutrient-dropdown',
-                    options=[{'label': n.replace('_', ' ').title(), 'value': n} for n in nutrition_columns],
+                    options=NUTRIENT_OPTIONS,
                     placeholder='Select a nutrient',
                     clearable=True,
                 ),
@@ -405,10 +602,7 @@ def nutritional_distribution_layout():
                 dbc.Label("Group By"),
                 dcc.Dropdown(
                     id='dist-groupby-dropdown',
-                    options=[
-                        {'label': 'Restaurant', 'value': 'restaurant'},
-                        {'label': 'Food Category', 'value': 'food_category'}
-                    ],
+                    options=GROUPBY_OPTIONS,
                     placeholder='Select a grouping variable',
                     clearable=True,
                 ),
@@ -425,7 +619,7 @@ def top_n_foods_layout():
                 dbc.Label("Select Nutrient"),
                 dcc.Dropdown(
                     id='top-nutrient-dropdown',
-                    options=[{'label': n.replace('_', ' ').title(), 'value': n} for n in nutrition_columns],
+                    options=NUTRIENT_OPTIONS,
                     placeholder='Select a nutrient',
                     clearable=True,
                 ),
@@ -464,7 +658,7 @@ def restaurant_averages_layout():
                 dbc.Label("Select Restaurants"),
                 dcc.Dropdown(
                     id='rest-avg-restaurants-dropdown',
-                    options=[{'label': r, 'value': r} for r in sorted(df['restaurant'].unique())],
+                    options=RESTAURANT_OPTIONS,
                     multi=True,
                     placeholder='Select restaurants',
                     clearable=True,
@@ -476,7 +670,7 @@ def restaurant_averages_layout():
                 dbc.Label("Select Nutrients"),
                 dcc.Dropdown(
                     id='rest-avg-nutrients-dropdown',
-                    options=[{'label': n.replace('_', ' ').title(), 'value': n} for n in nutrition_columns],
+                    options=NUTRIENT_OPTIONS,
                     multi=True,
                     placeholder='Select nutrients',
                     clearable=True,
@@ -493,7 +687,7 @@ def category_comparison_layout():
                 dbc.Label("Select Nutrient"),
                 dcc.Dropdown(
                     id='cat-comp-nutrient-dropdown',
-                    options=[{'label': n.replace('_', ' ').title(), 'value': n} for n in nutrition_columns],
+                    options=NUTRIENT_OPTIONS,
                     placeholder='Select a nutrient',
                     clearable=True,
                 ),
@@ -502,7 +696,7 @@ def category_comparison_layout():
                 dbc.Label("Select Categories to Compare"),
                 dcc.Dropdown(
                     id='cat-comp-categories-dropdown',
-                    options=[{'label': c, 'value': c} for c in sorted(df['food_category'].unique())],
+                    options=CATEGORY_OPTIONS,
                     multi=True,
                     placeholder='Select categories',
                     clearable=True,
@@ -519,7 +713,7 @@ def statistical_summary_layout():
                 dbc.Label("Select Nutrient"),
                 dcc.Dropdown(
                     id='stat-sum-nutrient-dropdown',
-                    options=[{'label': n.replace('_', ' ').title(), 'value': n} for n in nutrition_columns],
+                    options=NUTRIENT_OPTIONS,
                     placeholder='Select a nutrient',
                     clearable=True,
                 ),
@@ -528,10 +722,7 @@ def statistical_summary_layout():
                 dbc.Label("Group By"),
                 dcc.Dropdown(
                     id='stat-sum-groupby-dropdown',
-                    options=[
-                        {'label': 'Restaurant', 'value': 'restaurant'},
-                        {'label': 'Food Category', 'value': 'food_category'}
-                    ],
+                    options=GROUPBY_OPTIONS,
                     placeholder='Select a grouping variable',
                     clearable=True,
                 ),
@@ -540,6 +731,21 @@ def statistical_summary_layout():
         html.Div(id='statistical-summary-output'),
     ])
 
+# Box plot of a nutrient by group
+@cache.memoize()
+def distribution_figure(selected_nutrient, group_by):
+    # An explicit hovertemplate keeps the per-point hover labels short across the whole dataset
+    fig = go.Figure(go.Box(x=df[group_by], y=df[selected_nutrient], hovertemplate='%{y:.1f}<extra></extra>'))
+    fig.update_layout(
+        title=f'Distribution of {selected_nutrient.replace("_", " ").title()} by {group_by.replace("_", " ").title()}',
+        xaxis_title=group_by.replace('_', ' ').title(),
+        yaxis_title=selected_nutrient.replace('_', ' ').title(),
+        template='simple_white',
+        # Keep zoom/pan across re-renders of the same chart, but reset it when the inputs change
+        uirevision=f'{selected_nutrient}|{group_by}'
+    )
+    return fig.to_plotly_json()
+
 # Callbacks for Nutritional Distribution
 @app.callback(
     Output('distribution-output', 'children'),
@@ -548,24 +754,32 @@ def statistical_summary_layout():
 )
 def update_distribution_output(selected_nutrient, group_by):
     if selected_nutrient and group_by:
-        fig = px.box(
-            df,
-            x=group_by,
-            y=selected_nutrient,
-            title=f'Distribution of {selected_nutrient.replace("_", " ").title()} by {group_by.replace("_", " ").title()}',
-            labels={
-                group_by: group_by.replace('_', ' ').title(),
-                selected_nutrient: selected_nutrient.replace('_', ' ').title()
-            },
-            template='simple_white'
-        )
-        return dcc.Graph(figure=fig)
+        return dcc.Graph(figure=distribution_figure(selected_nutrient, group_by))
     # else:
     #     # Display a blank graph when inputs are not selected
     #     fig = px.box(title='Distribution')
     #     fig.update_layout(xaxis={'visible': False}, yaxis={'visible': False})
     #     return dcc.Graph(figure=fig)
 
+# Bar chart of the top items for a nutrient
+@cache.memoize()
+def top_n_figure(selected_nutrient, n, order):
+    sorted_df = TOPN_ASC[selected_nutrient] if order == 'asc' else TOPN_DESC[selected_nutrient]
+    top_n_df = sorted_df.head(n)
+    # One bar trace per restaurant, in order of first appearance
+    fig = go.Figure()
+    for restaurant, rest_df in top_n_df.groupby('restaurant', observed=True, sort=False):
+        fig.add_bar(name=restaurant, x=rest_df['item_name'], y=rest_df[selected_nutrient])
+    fig.update_layout(
+        barmode='relative',
+        title=f'Top {n} Foods by {selected_nutrient.replace("_", " ").title()}',
+        xaxis_title='Food Item',
+        yaxis_title=selected_nutrient.replace('_', ' ').title(),
+        legend_title_text='Restaurant',
+        template='simple_white'
+    )
+    return fig.to_plotly_json()
+
 # Callbacks for Top N Foods
 @app.callback(
     Output('top-n-output', 'children'),
@@ -575,28 +789,32 @@ def update_distribution_output(selected_nutrient, group_by):
 )
 def update_top_n_output(selected_nutrient, n, order):
     if selected_nutrient and n:
-        sorted_df = df[['item_name', 'restaurant', selected_nutrient]].dropna(subset=[selected_nutrient])
-        sorted_df = sorted_df.sort_values(by=selected_nutrient, ascending=(order == 'asc'))
-        top_n_df = sorted_df.head(n)
-        fig = px.bar(
-            top_n_df,
-            x='item_name',
-            y=selected_nutrient,
-            color='restaurant',
-            title=f'Top {n} Foods by {selected_nutrient.replace("_", " ").title()}',
-            labels={
-                'item_name': 'Food Item',
-                selected_nutrient: selected_nutrient.replace('_', ' ').title()
-            },
-            template='simple_white'
-        )
-        return dcc.Graph(figure=fig)
+        return dcc.Graph(figure=top_n_figure(selected_nutrient, n, order))
     # else:
     #     # Display a blank graph when inputs are not selected
     #     fig = px.bar(title='Top Foods')
     #     fig.update_layout(xaxis={'visible': False}, yaxis={'visible': False})
     #     return dcc.Graph(figure=fig)
 
+# Grouped bar chart of restaurant averages
+@cache.memoize()
+def restaurant_averages_figure(selected_restaurants, selected_nutrients):
+    avg_df = REST_MEANS.loc[REST_MEANS.index.isin(selected_restaurants), selected_nutrients]
+    restaurants = avg_df.index.to_numpy()
+    # One bar trace per nutrient
+    fig = go.Figure()
+    for nutrient, averages in zip(selected_nutrients, avg_df.to_numpy().T):
+        fig.add_bar(name=nutrient, x=restaurants, y=averages)
+    fig.update_layout(
+        barmode='group',
+        title='Average Nutrient Amounts by Restaurant',
+        xaxis_title='Restaurant',
+        yaxis_title='Average Amount',
+        legend_title_text='Nutrient',
+        template='simple_white'
+    )
+    return fig.to_plotly_json()
+
 # Callbacks for Restaurant Averages
 @app.callback(
     Output('restaurant-averages-output', 'children'),
@@ -605,34 +823,26 @@ def update_top_n_output(selected_nutrient, n, order):
 )
 def update_restaurant_averages_output(selected_restaurants, selected_nutrients):
     if selected_restaurants and selected_nutrients:
-        filtered_df = df[df['restaurant'].isin(selected_restaurants)]
-        avg_df = filtered_df.groupby('restaurant')[selected_nutrients].mean().reset_index()
-        melted_df = avg_df.melt(
-            id_vars='restaurant',
-            value_vars=selected_nutrients,
-            var_name='Nutrient',
-            value_name='Average Amount'
-        )
-        fig = px.bar(
-            melted_df,
-            x='restaurant',
-            y='Average Amount',
-            color='Nutrient',
-            barmode='group',
-            title='Average Nutrient Amounts by Restaurant',
-            labels={
-                'restaurant': 'Restaurant',
-                'Average Amount': 'Average Amount'
-            },
-            template='simple_white'
-        )
-        return dcc.Graph(figure=fig)
+        return dcc.Graph(figure=restaurant_averages_figure(selected_restaurants, selected_nutrients))
     # else:
     #     # Display a blank graph when inputs are not selected
     #     fig = px.bar(title='Restaurant Comparison')
     #     fig.update_layout(xaxis={'visible': False}, yaxis={'visible': False})
     #     return dcc.Graph(figure=fig)
 
+# Bar chart of category averages
+@cache.memoize()
+def category_comparison_figure(selected_nutrient, selected_categories):
+    avg_series = CAT_MEANS.loc[CAT_MEANS.index.isin(selected_categories), selected_nutrient]
+    fig = go.Figure(go.Bar(x=avg_series.index.to_numpy(), y=avg_series.to_numpy()))
+    fig.update_layout(
+        title=f'Average {selected_nutrient.replace("_", " ").title()} by Food Category',
+        xaxis_title='Food Category',
+        yaxis_title=f'Average {selected_nutrient.replace("_", " ").title()}',
+        template='simple_white'
+    )
+    return fig.to_plotly_json()
+
 # Callbacks for Category Comparison
 @app.callback(
     Output('category-comparison-output', 'children'),
@@ -641,20 +851,7 @@ def update_restaurant_averages_output(selected_restaurants, selected_nutrients):
 )
 def update_category_comparison_output(selected_nutrient, selected_categories):
     if selected_nutrient and selected_categories:
-        filtered_df = df[df['food_category'].isin(selected_categories)]
-        avg_df = filtered_df.groupby('food_category')[selected_nutrient].mean().reset_index()
-        fig = px.bar(
-            avg_df,
-            x='food_category',
-            y=selected_nutrient,
-            title=f'Average {selected_nutrient.replace("_", " ").title()} by Food Category',
-            labels={
-                'food_category': 'Food Category',
-                selected_nutrient: f'Average {selected_nutrient.replace("_", " ").title()}'
-            },
-            template='simple_white'
-        )
-        return dcc.Graph(figure=fig)
+        return dcc.Graph(figure=category_comparison_figure(selected_nutrient, selected_categories))
     # else:
     #     # Display a blank graph when inputs are not selected
     #     fig = px.bar(title='Category Comparison')
@@ -669,7 +866,7 @@ def update_category_comparison_output(selected_nutrient, selected_categories):
 )
 def update_statistical_summary_output(selected_nutrient, group_by):
     if selected_nutrient and group_by:
-        summary_df = df.groupby(group_by)[selected_nutrient].agg(['mean', 'median', 'std', 'min', 'max']).reset_index()
+        summary_df = SUMMARY_STATS[group_by][selected_nutrient].reset_index()
         summary_df = summary_df.round(2)
         table = dbc.Table.from_dataframe(
             summary_df,